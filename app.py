@@ -7,17 +7,17 @@ WHAT THIS APP DOES TO GET AI SUMMARY:
 1. INPUT PROCESSING:
    - Accepts 3 input types: PDF documents, Website URLs, YouTube videos
    - Extracts raw text content from each source type
-   - Validates and preprocesses the input data
+   - Validates and preprocesses the input data (boilerplate and duplicate sentences removed)
 
 2. TEXT EXTRACTION & LOADING:
-   - PDF: Uses PyPDFLoader to extract text from uploaded PDF files
-   - Website: Uses UnstructuredURLLoader to scrape and clean web content  
-   - YouTube: Uses YouTubeTranscriptApi to fetch video transcripts. For fallback, we use from langchain_community.document_loaders import YoutubeLoader
-                loader = YoutubeLoader.from_youtube_url(youtube_url, add_video_info=True)
+   - PDF: Uses pypdfium2 (PDFium bindings) to extract text from uploaded PDF files
+   - Website: Fetches pages concurrently with httpx and cleans them with unstructured's partition_html  
+   - YouTube: Tries the watch-page caption track (httpx + lxml) first, then hedges with
+              YouTubeTranscriptApi and LangChain's YoutubeLoader if it fails or stalls
 
 3. DOCUMENT CHUNKING:
-   - Splits large documents into smaller chunks (4000 chars with 200 overlap)
-   - Ensures content fits within LLM token limits
+   - Packs whole sentences into token-counted chunks (tiktoken, 200-token overlap)
+   - Sizes chunks to the selected model's context window
    - Maintains context between chunks
 
 4. AI MODEL SELECTION:
@@ -26,10 +26,11 @@ WHAT THIS APP DOES TO GET AI SUMMARY:
    - Models range from 8B to 120B parameters
 
 5. LLM SUMMARIZATION PROCESS:
-   - Uses LangChain's load_summarize_chain with "stuff" method
    - Feeds processed documents to selected Groq model
-   - For large docs: Hierarchical summarization (chunk -> combine)
-   - For small docs: Direct single-pass summarization
+   - For small docs: Direct single-pass summarization, streamed to the page
+   - For large docs: Async map-reduce - all chunks are summarized concurrently
+     (one batched fan-out), partial summaries are compressed pairwise if needed,
+     then a single streamed reduce call combines them
 
 6. OUTPUT GENERATION:
    - Receives summarized text from LLM
@@ -43,20 +44,60 @@ Raw Input → Text Extraction → Chunking → LLM Processing → Summary Output
 
 import streamlit as st
 import validators
-from langchain.chains.summarize import load_summarize_chain
-from langchain_community.document_loaders import UnstructuredURLLoader, PyPDFLoader
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_core.documents import Document
-from langchain_groq import ChatGroq
+import tiktoken
+import httpx
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import functools
+import hashlib
+import importlib.util
+import html
+import io
+import json
+import logging
+import math
+import re
+from string import Template
+import queue
+import sqlite3
 import tempfile
+import threading
+import time
 import os
+import platform
 
-# Try to import YouTube functionality
+# Loader, embedding and parsing libraries are imported where they are first used, so a
+# cold start only pays for the input method actually picked; optional ones are detected
+# here without importing them
+def module_available(*names):
+    return all(importlib.util.find_spec(name) is not None for name in names)
+
+# Check for YouTube functionality
+YOUTUBE_AVAILABLE = module_available("youtube_transcript_api")
+
+# Try to import orjson for faster JSON parsing
 try:
-    from youtube_transcript_api import YouTubeTranscriptApi
-    YOUTUBE_AVAILABLE = True
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# Try to import zstd for compressing cached summaries
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
 except ImportError:
-    YOUTUBE_AVAILABLE = False
+    ZSTD_AVAILABLE = False
+
+# Check for semantic cache functionality (near-duplicate input detection)
+SEMANTIC_CACHE_AVAILABLE = module_available("faiss", "numpy", "sentence_transformers")
+
+# Check for the ONNX Runtime backend for an int8-quantized embedding model
+ONNX_EMBEDDINGS_AVAILABLE = module_available("onnxruntime", "optimum")
+
+# Check for LLMLingua prompt compression of long documents
+LLMLINGUA_AVAILABLE = module_available("llmlingua")
 
 # Load .env if exists
 from dotenv import load_dotenv
@@ -155,625 +196,485 @@ GROQ_MODELS = {
     }
 }
 
+# Summarization Configuration
+# Upper bound on in-flight Groq requests per model across all sessions (keeps us under the QPM limit)
+MAX_CONCURRENT_REQUESTS = 10
+# While nothing streams, the progress message is redrawn this often: Streamlit only
+# delivers a stop or rerun when the script thread calls into it
+PROGRESS_REFRESH_SECONDS = 0.5
+# Map-step requests arriving within this window are dispatched together
+BATCH_WINDOW_SECONDS = 0.05
+MAX_BATCH_SIZE = 16
+# Documents summarized at once in batch mode; their Groq calls still share the limit above
+BATCH_DOCUMENT_CONCURRENCY = 8
+# Pooled HTTP/2 connections to the Groq API, shared by every request for a model. Every
+# call for a model (map, merge, reduce and single-call summaries) holds the semaphore
+# above, so no more than MAX_CONCURRENT_REQUESTS streams are ever open and a larger pool
+# would go unused. Every connection is kept alive, and for longer than httpx's 5 s
+# default, so the next summary does not pay a fresh TLS handshake after a pause
+GROQ_MAX_CONNECTIONS = MAX_CONCURRENT_REQUESTS
+GROQ_MAX_KEEPALIVE_CONNECTIONS = MAX_CONCURRENT_REQUESTS
+GROQ_KEEPALIVE_EXPIRY_SECONDS = 120
+# Extracted documents are cached across sessions; web pages and transcripts can
+# change, so those entries expire
+DOCUMENT_CACHE_TTL = 3600
+DOCUMENT_CACHE_MAX_ENTRIES = 32
+
+# Website fetching
+URL_FETCH_TIMEOUT = 30
+MAX_URL_CONNECTIONS = 20
+
+# YouTube transcript fetching
+YOUTUBE_WATCH_URL = "https://www.youtube.com/watch?v={video_id}"
+# Matches youtu.be/ and youtube.com watch?v= (also after other query params), shorts/ and
+# embed/ URLs; anchored to the host so ?v= on any other site is not taken for a video,
+# and the id must be exactly 11 characters. Hosts match in any case, as browsers do.
+YOUTUBE_VIDEO_ID_RE = re.compile(
+    r"^(?:https?://)?(?:(?:www|m|music)\.)?"
+    r"(?:youtu\.be/|youtube(?:-nocookie)?\.com/(?:watch\?(?:[^#]*&)?v=|shorts/|embed/|live/))"
+    r"([A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])",
+    re.IGNORECASE
+)
+YOUTUBE_TITLE_RE = re.compile(r'<meta name="title" content="([^"]*)"')
+# The thread-based fallbacks cannot be cancelled once running, so each one starts only
+# after every earlier source failed or has been slower than the hedge delay. They run on
+# their own small pool, and a hung fallback is abandoned after the timeout.
+YOUTUBE_HEDGE_DELAY_SECONDS = 5
+YOUTUBE_FALLBACK_TIMEOUT = 30
+YOUTUBE_FALLBACK_WORKERS = 4
+
+CHUNK_OVERLAP_TOKENS = 200
+# Chunks are packed from whole lines and sentences, found in a single regex pass. Line
+# breaks are captured so chunks keep headings, lists and paragraphs on their own lines
+SPLIT_RE = re.compile(r"(\n+)|(?<=[.!?])\s+")
+# Tokens kept free in every request for the generated summary and prompt scaffolding
+OUTPUT_RESERVE_TOKENS = 4096
+PROMPT_MARGIN_TOKENS = 2000
+# cl100k_base only approximates the Groq models' own tokenizers, so budgets are
+# computed against this fraction of the advertised context window
+CONTEXT_SAFETY_FRACTION = 0.8
+TOKENIZER_ENCODING = "cl100k_base"
+# Partial summaries are combined pairwise until the reduce input fits this budget
+REDUCE_INPUT_TOKEN_BUDGET = 8000
+
+# Summary cache: exact content-hash hits, plus semantic hits for inputs whose opening
+# excerpts embed at least this similarly. Every candidate must also share this fraction
+# of its word shingles over the whole text (estimated from a bottom-k sketch), so
+# documents filled in from one template do not get each other's summary.
+SUMMARY_CACHE_PATH = os.path.join(tempfile.gettempdir(), "ai_summarizer_cache.sqlite")
+SEMANTIC_CACHE_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+SEMANTIC_CACHE_THRESHOLD = 0.95
+SEMANTIC_CACHE_LEAD_CHARS = 2000
+SEMANTIC_CACHE_SHINGLE_WORDS = 5
+SEMANTIC_CACHE_SKETCH_SIZE = 256
+SEMANTIC_CACHE_MIN_JACCARD = 0.9
+SUMMARY_COMPRESSION_LEVEL = 3
+# LLMLingua-2 keeps this fraction of each map-step chunk's tokens; the BERT-base model
+# is used over the XLM-RoBERTa-large one because Spaces run the classifier on CPU
+PROMPT_COMPRESSION_MODEL = "microsoft/llmlingua-2-bert-base-multilingual-cased-meetingbank"
+PROMPT_COMPRESSION_RATE = 0.4
+
+# Shared system prefix for every summarization call. Keep it byte-identical (no
+# interpolation) so Groq's prompt caching can reuse the prefill across chunk calls.
+SUMMARY_INSTRUCTIONS = (
+    "You are an expert document summarizer. You will receive text extracted from a PDF, "
+    "a web page or a video transcript, wrapped in <document> tags, or a set of partial "
+    "summaries of consecutive sections of one document, wrapped in <summaries> tags.\n\n"
+    "Guidelines:\n"
+    "- Capture the main topic, key arguments, findings and conclusions.\n"
+    "- Preserve important names, numbers, dates and technical terms exactly.\n"
+    "- Ignore navigation menus, advertisements, boilerplate and transcript noise.\n"
+    "- Do not invent information that is not present in the input.\n"
+    "- Write clear, well-structured prose in the language of the input.\n"
+    "- Be concise: prefer a few dense paragraphs over long lists."
+)
+
+# Plain str.format templates: chunks stay raw strings all the way to the request
+MAP_PROMPT = "<document>\n{text}\n</document>\nSummarize the document above."
+REDUCE_PROMPT = (
+    "<summaries>\n{text}\n</summaries>\n"
+    "Combine these partial summaries into a single concise summary of the whole document."
+)
+
+# Part of every summary cache key, so editing any prompt invalidates old summaries
+PROMPT_VERSION = hashlib.sha256(
+    (SUMMARY_INSTRUCTIONS + MAP_PROMPT + REDUCE_PROMPT).encode()
+).hexdigest()[:12]
+
+def build_messages(prompt, text):
+    """Stable system prefix first, variable content last (as LangChain message tuples)"""
+    return [("system", SUMMARY_INSTRUCTIONS), ("human", prompt.format(text=text))]
+
+def parse_context_tokens(context):
+    """Convert a context label such as '131K' into a token count"""
+    return int(context.rstrip("K")) * 1000
+
+# Context window (in tokens) for each model id
+MODEL_CONTEXT_TOKENS = {
+    config["id"]: parse_context_tokens(config["context"]) for config in GROQ_MODELS.values()
+}
+
+# Pre-summarization cleanup for website and YouTube text. Short lines that are nothing
+# but navigation, cookie banners, calls to action or bare timestamps are dropped before
+# they cost tokens; each pattern has to cover the whole line.
+BOILERPLATE_LINE_MAX_CHARS = 120
+BOILERPLATE_LINE_RE = re.compile(
+    r"^\s*(?:"
+    r"\d{1,2}:\d{2}(?::\d{2})?"
+    r"|(?:please\s+)?(?:like\s+and\s+)?subscribe(?:\s+(?:now|here|today))?[.!]?"
+    r"|(?:our\s+)?cookie (?:policy|settings|preferences)"
+    r"|accept(?: all)? cookies"
+    r"|sign in|log in|sign up|share|print|menu|skip to (?:main )?content"
+    r"|(?:(?:©|\(c\)|copyright)[^.]{0,80}\.?\s*)?all rights reserved\.?"
+    r")\s*$",
+    re.IGNORECASE
+)
+CAPTION_TAG_RE = re.compile(r"\[(?:music|applause|laughter)\]", re.IGNORECASE)
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+NON_WORD_RE = re.compile(r"\W+")
+# Sentences shorter than this ("Yes.", "Thank you.") legitimately repeat and are kept
+DEDUPE_MIN_CHARS = 20
+
+# Summary analytics: counts words without materializing the list that str.split builds
+WORD_RE = re.compile(r"\S+")
+
+logger = logging.getLogger(__name__)
+
 # Enhanced Custom CSS for better card-based radio selection and wider sidebar
-st.markdown("""
-<style>
-    /* Import Google Fonts */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&family=Poppins:wght@300;400;500;600;700&display=swap');
-    
-    /* Hide default streamlit styling */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    .stDeployButton {display:none;}
-    
-    /* WIDER SIDEBAR - Key fix here */
-    section[data-testid="stSidebar"] {
-        width: 420px !important;
-        min-width: 420px !important;
-    }
-    
-    section[data-testid="stSidebar"] > div:first-child {
-        width: 420px !important;
-        min-width: 420px !important;
-    }
-    
-    section[data-testid="stSidebar"][aria-expanded="true"] > div:first-child {
-        width: 420px !important;
-        margin-left: 0px !important;
-    }
-    
-    section[data-testid="stSidebar"][aria-expanded="false"] > div:first-child {
-        width: 420px !important;
-        margin-left: -420px !important;
-    }
-    
-    /* Adjust main content area to account for wider sidebar */
-    .main .block-container {
-        padding-left: 1rem !important;
-        padding-right: 1rem !important;
-        max-width: none !important;
-    }
-    
-    /* Main app styling */
-    .main-header {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 2.5rem 2rem;
-        border-radius: 20px;
-        margin-bottom: 2rem;
-        text-align: center;
-        color: white;
-        box-shadow: 0 10px 40px rgba(31, 38, 135, 0.4);
-        backdrop-filter: blur(10px);
-    }
-    
-    .main-header h1 {
-        font-family: 'Poppins', sans-serif;
-        font-weight: 700;
-        font-size: 2.8rem;
-        margin: 0;
-        text-shadow: 2px 2px 8px rgba(0,0,0,0.3);
-        letter-spacing: -0.5px;
-    }
-    
-    .main-header p {
-        font-family: 'Inter', sans-serif;
-        font-weight: 400;
-        font-size: 1.3rem;
-        margin: 1rem 0 0 0;
-        opacity: 0.95;
-        max-width: 600px;
-        margin-left: auto;
-        margin-right: auto;
-    }
-    
-    /* Step sections with enhanced styling */
-    .step-container {
-        background: linear-gradient(145deg, #ffffff 0%, #f8faff 100%);
-        border-radius: 16px;
-        padding: 2rem;
-        margin: 2rem 0;
-        border: 1px solid #e8ecf7;
-        box-shadow: 0 8px 32px rgba(102, 126, 234, 0.08);
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .step-container::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        height: 4px;
-        background: linear-gradient(90deg, #667eea, #764ba2);
-    }
-    
-    [data-theme="dark"] .step-container {
-        background: linear-gradient(145deg, #1a1a1a 0%, #2d2d2d 100%);
-        border-color: #404040;
-    }
-    
-    .step-header {
-        font-family: 'Poppins', sans-serif;
-        font-weight: 600;
-        font-size: 1.4rem;
-        margin-bottom: 1.5rem;
-        display: flex;
-        align-items: center;
-        gap: 0.75rem;
-        color: #2c3e50;
-    }
-    
-    [data-theme="dark"] .step-header {
-        color: #ecf0f1;
-    }
-    
-    /* Enhanced Method Selection Cards */
-    .method-selection-container {
-        display: grid;
-        grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
-        gap: 1.5rem;
-        margin: 2rem 0;
-    }
-    
-    .method-card {
-        background: linear-gradient(145deg, #ffffff 0%, #f8faff 100%);
-        border-radius: 16px;
-        padding: 1.8rem;
-        border: 2px solid #e8ecf7;
-        transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-        cursor: pointer;
-        position: relative;
-        overflow: hidden;
-        box-shadow: 0 4px 20px rgba(0, 0, 0, 0.08);
-    }
-    
-    .method-card:hover {
-        transform: translateY(-8px);
-        box-shadow: 0 12px 40px rgba(102, 126, 234, 0.2);
-        border-color: #667eea;
-    }
-    
-    .method-card.selected {
-        border-color: #667eea;
-        background: linear-gradient(145deg, #f0f3ff 0%, #ffffff 100%);
-        transform: translateY(-4px);
-        box-shadow: 0 8px 30px rgba(102, 126, 234, 0.25);
-    }
-    
-    [data-theme="dark"] .method-card {
-        background: linear-gradient(145deg, #2d2d2d 0%, #1a1a1a 100%);
-        border-color: #404040;
-    }
-    
-    [data-theme="dark"] .method-card:hover {
-        border-color: #8b9aff;
-        box-shadow: 0 12px 40px rgba(139, 154, 255, 0.15);
-    }
-    
-    .method-icon {
-        font-size: 3rem;
-        margin-bottom: 1rem;
-        display: block;
-        text-align: center;
-        filter: drop-shadow(0 2px 4px rgba(0,0,0,0.1));
-    }
-    
-    .method-title {
-        font-family: 'Poppins', sans-serif;
-        font-weight: 600;
-        font-size: 1.3rem;
-        color: #2c3e50;
-        margin-bottom: 0.8rem;
-        text-align: center;
-    }
-    
-    [data-theme="dark"] .method-title {
-        color: #ecf0f1;
-    }
-    
-    .method-description {
-        font-family: 'Inter', sans-serif;
-        font-size: 0.95rem;
-        color: #64748b;
-        line-height: 1.6;
-        text-align: center;
-        margin: 0;
-    }
-    
-    [data-theme="dark"] .method-description {
-        color: #94a3b8;
-    }
-    
-    .method-features {
-        margin-top: 1rem;
-        padding-top: 1rem;
-        border-top: 1px solid #e8ecf7;
-    }
-    
-    [data-theme="dark"] .method-features {
-        border-top-color: #404040;
-    }
-    
-    .feature-item {
-        font-family: 'Inter', sans-serif;
-        font-size: 0.85rem;
-        color: #667eea;
-        margin: 0.3rem 0;
-        display: flex;
-        align-items: center;
-        gap: 0.5rem;
-        justify-content: center;
-    }
-    
-    [data-theme="dark"] .feature-item {
-        color: #8b9aff;
-    }
-    
-    /* Hide default radio buttons completely */
-    .stRadio {
-        display: none !important;
-    }
-    
-    /* Model Selection Card Styling */
-    .model-card {
-        background: linear-gradient(145deg, #f8faff, #ffffff);
-        border: 2px solid #e8ecf7;
-        border-radius: 12px;
-        padding: 1rem;
-        margin: 0.5rem 0;
-        transition: all 0.3s ease;
-        cursor: pointer;
-    }
-    
-    .model-card:hover {
-        border-color: #667eea;
-        box-shadow: 0 4px 15px rgba(102, 126, 234, 0.15);
-    }
-    
-    .model-card.selected {
-        border-color: #667eea;
-        background: linear-gradient(145deg, #f0f3ff, #ffffff);
-        box-shadow: 0 4px 20px rgba(102, 126, 234, 0.2);
-    }
-    
-    [data-theme="dark"] .model-card {
-        background: linear-gradient(145deg, #2d2d2d, #1a1a1a);
-        border-color: #404040;
-    }
-    
-    [data-theme="dark"] .model-card:hover {
-        border-color: #8b9aff;
-    }
-    
-    /* Enhanced Input Sections */
-    .input-section {
-        background: linear-gradient(145deg, #ffffff 0%, #f8faff 100%);
-        border-radius: 12px;
-        padding: 2rem;
-        margin: 1.5rem 0;
-        border: 1px solid #e8ecf7;
-        box-shadow: 0 4px 20px rgba(0, 0, 0, 0.06);
-    }
-    
-    [data-theme="dark"] .input-section {
-        background: linear-gradient(145deg, #2d2d2d 0%, #1a1a1a 100%);
-        border-color: #404040;
-    }
-    
-    .input-title {
-        font-family: 'Poppins', sans-serif;
-        font-weight: 600;
-        font-size: 1.2rem;
-        color: #2c3e50;
-        margin-bottom: 1.5rem;
-        display: flex;
-        align-items: center;
-        gap: 0.5rem;
-    }
-    
-    [data-theme="dark"] .input-title {
-        color: #ecf0f1;
-    }
-    
-    /* Enhanced Buttons */
-    .stButton > button {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border: none;
-        border-radius: 12px;
-        padding: 0.75rem 2rem;
-        font-family: 'Inter', sans-serif;
-        font-weight: 500;
-        font-size: 1rem;
-        transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-        box-shadow: 0 6px 20px rgba(102, 126, 234, 0.3);
-        width: 100%;
-        min-height: 48px;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-3px);
-        box-shadow: 0 8px 25px rgba(102, 126, 234, 0.4);
-        background: linear-gradient(135deg, #5a72e8 0%, #6d42a0 100%);
-    }
-    
-    .stButton > button:active {
-        transform: translateY(-1px);
-    }
-    
-    /* Primary button variant */
-    .stButton > button[kind="primary"] {
-        background: linear-gradient(135deg, #10b981 0%, #059669 100%);
-        box-shadow: 0 6px 20px rgba(16, 185, 129, 0.3);
-        font-weight: 600;
-        font-size: 1.1rem;
-        padding: 1rem 2rem;
-    }
-    
-    .stButton > button[kind="primary"]:hover {
-        background: linear-gradient(135deg, #059669 0%, #047857 100%);
-        box-shadow: 0 8px 25px rgba(16, 185, 129, 0.4);
-    }
-    
-    /* Status messages with better styling */
-    .status-success {
-        background: linear-gradient(135deg, #10b981, #059669);
-        color: white;
-        padding: 1rem 1.5rem;
-        border-radius: 12px;
-        margin: 1rem 0;
-        font-family: 'Inter', sans-serif;
-        font-weight: 500;
-        display: flex;
-        align-items: center;
-        gap: 0.75rem;
-        box-shadow: 0 4px 15px rgba(16, 185, 129, 0.2);
-    }
-    
-    .status-error {
-        background: linear-gradient(135deg, #ef4444, #dc2626);
-        color: white;
-        padding: 1rem 1.5rem;
-        border-radius: 12px;
-        margin: 1rem 0;
-        font-family: 'Inter', sans-serif;
-        font-weight: 500;
-        display: flex;
-        align-items: center;
-        gap: 0.75rem;
-        box-shadow: 0 4px 15px rgba(239, 68, 68, 0.2);
-    }
-    
-    .status-info {
-        background: linear-gradient(135deg, #3b82f6, #2563eb);
-        color: white;
-        padding: 1rem 1.5rem;
-        border-radius: 12px;
-        margin: 1rem 0;
-        font-family: 'Inter', sans-serif;
-        font-weight: 500;
-        display: flex;
-        align-items: center;
-        gap: 0.75rem;
-        box-shadow: 0 4px 15px rgba(59, 130, 246, 0.2);
-    }
-    
-    .status-warning {
-        background: linear-gradient(135deg, #f59e0b, #d97706);
-        color: white;
-        padding: 1rem 1.5rem;
-        border-radius: 12px;
-        margin: 1rem 0;
-        font-family: 'Inter', sans-serif;
-        font-weight: 500;
-        display: flex;
-        align-items: center;
-        gap: 0.75rem;
-        box-shadow: 0 4px 15px rgba(245, 158, 11, 0.2);
-    }
-    
-    /* File uploader enhancement */
-    .stFileUploader > div {
-        background: linear-gradient(145deg, #f8faff, #ffffff);
-        border: 3px dashed #667eea;
-        border-radius: 16px;
-        padding: 3rem 2rem;
-        text-align: center;
-        transition: all 0.3s ease;
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .stFileUploader > div:hover {
-        border-color: #764ba2;
-        background: linear-gradient(145deg, #f0f3ff, #f8faff);
-        transform: scale(1.02);
-    }
-    
-    /* Text input enhancement */
-    .stTextInput > div > div > input {
-        border-radius: 12px;
-        border: 2px solid #e8ecf7;
-        padding: 0.75rem 1.25rem;
-        font-size: 1rem;
-        font-family: 'Inter', sans-serif;
-        transition: all 0.3s ease;
-        background: linear-gradient(145deg, #ffffff, #f8faff);
-    }
-    
-    .stTextInput > div > div > input:focus {
-        border-color: #667eea;
-        box-shadow: 0 0 0 4px rgba(102, 126, 234, 0.1);
-        background: #ffffff;
-    }
-    
-    /* Selectbox enhancement */
-    .stSelectbox > div > div > div {
-        border-radius: 12px;
-        border: 2px solid #e8ecf7;
-        background: linear-gradient(145deg, #ffffff, #f8faff);
-    }
-    
-    .stSelectbox > div > div > div:focus-within {
-        border-color: #667eea;
-        box-shadow: 0 0 0 4px rgba(102, 126, 234, 0.1);
-    }
-    
-    /* Summary result styling */
-    .summary-container {
-        background: linear-gradient(145deg, #ffffff 0%, #f8faff 100%);
-        border-radius: 20px;
-        padding: 2.5rem;
-        margin: 2rem 0;
-        border: 1px solid #e8ecf7;
-        box-shadow: 0 12px 40px rgba(0,0,0,0.1);
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .summary-container::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        height: 4px;
-        background: linear-gradient(90deg, #10b981, #059669);
-    }
-    
-    [data-theme="dark"] .summary-container {
-        background: linear-gradient(145deg, #2d2d2d 0%, #1a1a1a 100%);
-        border-color: #404040;
-    }
-    
-    .summary-text {
-        font-family: 'Inter', sans-serif;
-        font-size: 1.1rem;
-        line-height: 1.8;
-        color: #2c3e50;
-        background: linear-gradient(145deg, #f8faff, #ffffff);
-        padding: 2rem;
-        border-radius: 16px;
-        border: 1px solid #e8ecf7;
-        box-shadow: inset 0 2px 8px rgba(0,0,0,0.04);
-    }
-    
-    [data-theme="dark"] .summary-text {
-        color: #ecf0f1;
-        background: linear-gradient(145deg, #1a1a1a, #2d2d2d);
-        border-color: #404040;
-    }
-    
-    /* Metrics styling */
-    .metric-card {
-        background: linear-gradient(135deg, #667eea, #764ba2);
-        color: white;
-        padding: 1.5rem;
-        border-radius: 16px;
-        text-align: center;
-        margin: 0.5rem 0;
-        box-shadow: 0 6px 20px rgba(102, 126, 234, 0.25);
-        font-family: 'Inter', sans-serif;
-        transition: transform 0.3s ease;
-    }
-    
-    .metric-card:hover {
-        transform: translateY(-4px);
-    }
-    
-    /* Sidebar specific styling */
-    .sidebar-header {
-        background: linear-gradient(135deg, #667eea, #764ba2);
-        color: white;
-        padding: 1.5rem;
-        border-radius: 16px;
-        margin-bottom: 1.5rem;
-        box-shadow: 0 8px 25px rgba(102, 126, 234, 0.3);
-        text-align: center;
-    }
-    
-    .sidebar-status {
-        padding: 1rem;
-        border-radius: 12px;
-        margin-bottom: 1rem;
-        text-align: center;
-        font-weight: 500;
-        font-family: 'Inter', sans-serif;
-    }
-    
-    /* Responsive design */
-   @media (max-width: 768px) {
-        section[data-testid=stSidebar][aria-expanded="false"] {
-          width: 0 !important;
-          min-width: 0 !important;
-          overflow: hidden !important;
-        }
-      
-        .main {
-          margin-left: 0 !important;
-        }
-      
-        section[data-testid=stSidebar] {
-          z-index: 1000 !important;
-        }
+CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "app.css")
 
-        
-        .method-selection-container {
-            grid-template-columns: 1fr;
-            gap: 1rem;
-        }
-        
-        .method-card {
-            padding: 1.5rem;
-        }
-        
-        .main-header h1 {
-            font-size: 2.2rem;
-        }
-        
-        .main-header p {
-            font-size: 1.1rem;
-        }
-    }
-    
-    /* Animation keyframes */
-    @keyframes fadeInUp {
-        from {
-            opacity: 0;
-            transform: translateY(30px);
-        }
-        to {
-            opacity: 1;
-            transform: translateY(0);
-        }
-    }
-    
-    .animated {
-        animation: fadeInUp 0.6s ease-out;
-    }
-</style>
-""", unsafe_allow_html=True)
+@st.cache_data(show_spinner=False)
+def load_css():
+    """Read the stylesheet once; later reruns reuse the cached string"""
+    with open(CSS_PATH, encoding="utf-8") as css_file:
+        return f"<style>\n{css_file.read()}</style>"
+
+@dataclass
+class AppState:
+    """Per-session UI state, stored once under a single session_state key"""
+    summary_result: str = ""
+    documents: list = None
+    content_loaded: bool = False
+    input_type: str = None
+    selected_method: str = "📄 PDF Document"
+    selected_model: str = "🚀 Llama 3.1 8B (Fast)"
+    batch_results: list = None  # (file name, summary or None) per batch-mode PDF
 
 # Initialize session state
-if 'summary_result' not in st.session_state:
-    st.session_state.summary_result = ""
-if 'documents' not in st.session_state:
-    st.session_state.documents = None
-if 'content_loaded' not in st.session_state:
-    st.session_state.content_loaded = False
-if 'input_type' not in st.session_state:
-    st.session_state.input_type = None
-if 'selected_method' not in st.session_state:
-    st.session_state.selected_method = "📄 PDF Document"
-if 'selected_model' not in st.session_state:
-    st.session_state.selected_model = "🚀 Llama 3.1 8B (Fast)"
-
-def get_llm():
-    """Initialize the LLM with selected Groq model"""
-    model_config = GROQ_MODELS[st.session_state.selected_model]
+if 'app_state' not in st.session_state:
+    st.session_state.app_state = AppState()
+state = st.session_state.app_state
+
+@st.cache_resource(show_spinner=False)
+def get_event_loop():
+    """Long-lived event loop on a daemon thread, so pooled async clients outlive a rerun"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="async-io", daemon=True).start()
+    return loop
+
+def run_async(coro, placeholder=None, updates=None):
+    """Run a coroutine on the shared event loop and wait for its result.
+    
+    Streamlit elements can only be updated from the script thread, so progress messages
+    and streamed text pushed onto the updates queue are rendered into the placeholder
+    from here. The latest message is redrawn every PROGRESS_REFRESH_SECONDS while the
+    queue is quiet, because a stop or rerun only reaches the script thread when it calls
+    into Streamlit. The coroutine is then cancelled, so queued map requests are skipped
+    and no further tokens are generated for a result nobody will see. Without a
+    placeholder the wait cannot be interrupted.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+    try:
+        text = None
+        last_render = time.monotonic()
+        while placeholder is not None and not (future.done() and updates.empty()):
+            try:
+                text = updates.get(timeout=0.05)
+            except queue.Empty:
+                if text is not None and time.monotonic() - last_render >= PROGRESS_REFRESH_SECONDS:
+                    placeholder.markdown(text)
+                    last_render = time.monotonic()
+                continue
+            while not updates.empty():
+                text = updates.get_nowait()
+            placeholder.markdown(text)
+            last_render = time.monotonic()
+        return future.result()
+    except BaseException:
+        # Streamlit interrupts the script thread with BaseException subclasses on stop/rerun
+        future.cancel()
+        raise
+
+@st.cache_resource(show_spinner=False)
+def get_llm(model_id):
+    """Initialize the LLM for a Groq model id - one cached client per model, reusing a
+    pooled HTTP/2 connection across sessions and reruns"""
+    # Imported on first use so the page renders before LangChain's cold import cost
+    from langchain_groq import ChatGroq
+    
     return ChatGroq(
         temperature=0,
-        model=model_config["id"],
+        model=model_id,
         max_tokens=None,
         timeout=None,
-        max_retries=2
+        max_retries=2,
+        http_async_client=httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=GROQ_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=GROQ_KEEPALIVE_EXPIRY_SECONDS
+            )
+        )
     )
 
 def extract_video_id(youtube_url):
     """Extract video ID from YouTube URL"""
-    if "youtu.be/" in youtube_url:
-        return youtube_url.split("youtu.be/")[1].split("?")[0]
-    elif "watch?v=" in youtube_url:
-        return youtube_url.split("watch?v=")[1].split("&")[0]
-    return None
+    match = YOUTUBE_VIDEO_ID_RE.match(youtube_url.strip())
+    return match.group(1) if match else None
+
+@st.cache_data(show_spinner=False, max_entries=DOCUMENT_CACHE_MAX_ENTRIES)
+def extract_pdf_documents(pdf_hash, file_name, _pdf_bytes):
+    """Extract one Document per page, cached on the file hash"""
+    from langchain_core.documents import Document
+    import pypdfium2 as pdfium
+    
+    # Parse straight from the uploaded bytes - no temporary file round-trip
+    pdf = pdfium.PdfDocument(_pdf_bytes)
+    documents = []
+    # PDFium is not thread-safe, so pages are extracted sequentially; each page is
+    # closed as soon as its text is read to keep memory flat on large files
+    try:
+        for page_number in range(len(pdf)):
+            page = pdf[page_number]
+            textpage = page.get_textpage()
+            documents.append(Document(
+                page_content=textpage.get_text_range(),
+                metadata={"source": file_name, "page": page_number}
+            ))
+            textpage.close()
+            page.close()
+    finally:
+        pdf.close()
+    
+    return documents
 
 def load_pdf_documents(uploaded_file):
     """Load and process PDF documents"""
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            tmp_file_path = tmp_file.name
-        
-        loader = PyPDFLoader(tmp_file_path)
-        documents = loader.load()
-        
-        os.unlink(tmp_file_path)
-        return documents
+        pdf_bytes = uploaded_file.getvalue()
+        pdf_hash = hashlib.blake2b(pdf_bytes, digest_size=16).hexdigest()
+        return extract_pdf_documents(pdf_hash, uploaded_file.name, pdf_bytes)
     except Exception as e:
         st.error(f"Error loading PDF: {str(e)}")
         return None
 
-def load_url_documents(url):
-    """Load and process URL documents"""
+@st.cache_resource(show_spinner=False)
+def get_web_client():
+    """Process-wide pooled client for website fetches, keeping connections alive between loads"""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=MAX_URL_CONNECTIONS,
+            max_keepalive_connections=MAX_URL_CONNECTIONS
+        ),
+        timeout=URL_FETCH_TIMEOUT,
+        follow_redirects=True
+    )
+
+async def fetch_html_pages(urls, client):
+    """Fetch all URLs concurrently over the shared pooled client"""
+    async def fetch(url):
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.text
+    
+    return await asyncio.gather(*[fetch(url) for url in urls])
+
+@st.cache_data(show_spinner=False, ttl=DOCUMENT_CACHE_TTL, max_entries=DOCUMENT_CACHE_MAX_ENTRIES)
+def extract_url_documents(urls):
+    """Fetch and clean a tuple of URLs, cached on the URLs"""
+    from langchain_core.documents import Document
+    from unstructured.partition.html import partition_html
+    
+    html_pages = run_async(fetch_html_pages(urls, get_web_client()))
+    documents = []
+    for url, html_page in zip(urls, html_pages):
+        elements = partition_html(text=html_page)
+        documents.append(Document(
+            page_content="\n\n".join(str(element) for element in elements),
+            metadata={"source": url}
+        ))
+    return documents
+
+def load_url_documents(urls):
+    """Load and process URL documents from a single URL or a list of URLs"""
     try:
-        loader = UnstructuredURLLoader(urls=[url])
-        documents = loader.load()
-        return documents
+        if isinstance(urls, str):
+            urls = [urls]
+        return extract_url_documents(tuple(urls))
     except Exception as e:
         st.error(f"Error loading URL: {str(e)}")
         return None
 
+@st.cache_resource(show_spinner=False)
+def get_youtube_client():
+    """Process-wide HTTP/2 client for YouTube, kept warm between transcript fetches"""
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=URL_FETCH_TIMEOUT,
+        follow_redirects=True,
+        headers={"Accept-Language": "en-US,en;q=0.9"},
+        cookies={"CONSENT": "YES+"}
+    )
+
+@st.cache_resource(show_spinner=False)
+def get_youtube_executor():
+    """Dedicated worker pool for the blocking transcript fallbacks, so a stuck request
+    never occupies the event loop's default executor used by summarization"""
+    return ThreadPoolExecutor(max_workers=YOUTUBE_FALLBACK_WORKERS, thread_name_prefix="youtube-fallback")
+
+def select_caption_track(tracks):
+    """Prefer manual English captions, then generated English, then the first track"""
+    for generated in (False, True):
+        for track in tracks:
+            is_generated = track.get("kind") == "asr"
+            if track.get("languageCode", "").startswith("en") and is_generated == generated:
+                return track
+    return tracks[0]
+
+async def fetch_youtube_transcript(video_id, youtube_url, client):
+    """Fetch a transcript directly from the watch page and its timedtext caption track"""
+    from langchain_core.documents import Document
+    from lxml import etree
+    
+    watch_page = await client.get(YOUTUBE_WATCH_URL.format(video_id=video_id))
+    watch_page.raise_for_status()
+    page_text = watch_page.text
+    
+    captions_json = page_text.split('"captions":', 1)[1].split(',"videoDetails', 1)[0]
+    tracks = json_loads(captions_json)["playerCaptionsTracklistRenderer"]["captionTracks"]
+    track = select_caption_track(tracks)
+    
+    # Start downloading the caption track while the rest of the page is parsed
+    timedtext_task = asyncio.create_task(client.get(track["baseUrl"]))
+    title_match = YOUTUBE_TITLE_RE.search(page_text)
+    name = track.get("name", {})
+    language = name.get("simpleText") or "".join(run["text"] for run in name.get("runs", []))
+    
+    timedtext = await timedtext_task
+    timedtext.raise_for_status()
+    # Stream the cues and clear each node once read instead of building the whole tree
+    cues = []
+    for _, element in etree.iterparse(io.BytesIO(timedtext.content), tag="text"):
+        if element.text:
+            cues.append(html.unescape(element.text))
+        element.clear()
+    transcript_text = " ".join(cues)
+    if not transcript_text:
+        raise ValueError("Caption track is empty")
+    
+    return Document(
+        page_content=transcript_text,
+        metadata={
+            "source": youtube_url,
+            "video_id": video_id,
+            "title": html.unescape(title_match.group(1)) if title_match else "",
+            "language": language,
+            "language_code": track.get("languageCode", ""),
+            "is_generated": track.get("kind") == "asr"
+        }
+    )
+
+def fetch_transcript_api(video_id, youtube_url):
+    """Fetch a transcript with YouTubeTranscriptApi (blocking; run in a worker thread)"""
+    from langchain_core.documents import Document
+    from youtube_transcript_api import YouTubeTranscriptApi
+    
+    # Use the new fetch() method instead of get_transcript()
+    fetched_transcript = YouTubeTranscriptApi().fetch(video_id)
+    
+    # Extract text from the transcript
+    transcript_text = " ".join(snippet.text for snippet in fetched_transcript)
+    
+    return [Document(
+        page_content=transcript_text,
+        metadata={
+            "source": youtube_url,
+            "video_id": video_id,
+            "language": fetched_transcript.language,
+            "language_code": fetched_transcript.language_code,
+            "is_generated": fetched_transcript.is_generated
+        }
+    )]
+
+def fetch_transcript_loader(youtube_url):
+    """Fetch a transcript with LangChain's YoutubeLoader (blocking; run in a worker thread)"""
+    from langchain_community.document_loaders import YoutubeLoader
+    
+    loader = YoutubeLoader.from_youtube_url(youtube_url, add_video_info=True)
+    documents = loader.load()
+    if not documents:
+        raise ValueError("YoutubeLoader returned no transcript")
+    return documents
+
+async def fetch_first_transcript(video_id, youtube_url, client, executor):
+    """Try the transcript sources in order and return the first one that succeeds.
+    
+    The direct watch-page fetch goes first. Each fallback is started only once every
+    earlier source has failed or has run past YOUTUBE_HEDGE_DELAY_SECONDS, so a normal
+    load makes a single set of YouTube requests. The direct fetch is cancelled if a
+    fallback wins; a fallback thread that is already running finishes in the background
+    on the dedicated executor.
+    """
+    loop = asyncio.get_running_loop()
+    
+    async def direct():
+        return [await fetch_youtube_transcript(video_id, youtube_url, client)]
+    
+    def in_executor(func, *args):
+        return asyncio.wait_for(loop.run_in_executor(executor, func, *args), YOUTUBE_FALLBACK_TIMEOUT)
+    
+    sources = [
+        ("Direct", direct),
+        ("Transcript API", lambda: in_executor(fetch_transcript_api, video_id, youtube_url)),
+        ("YoutubeLoader", lambda: in_executor(fetch_transcript_loader, youtube_url))
+    ]
+    running = {}
+    errors = []
+    
+    def first_success(done):
+        for task in done:
+            name = running.pop(task)
+            if task.exception() is None:
+                for other in running:
+                    other.cancel()
+                return task.result()
+            errors.append(f"{name}: {str(task.exception())[:100]}...")
+        return None
+    
+    for name, start in sources:
+        running[asyncio.ensure_future(start())] = name
+        done, _ = await asyncio.wait(
+            running, timeout=YOUTUBE_HEDGE_DELAY_SECONDS, return_when=asyncio.FIRST_COMPLETED
+        )
+        result = first_success(done)
+        if result is not None:
+            return result
+    
+    while running:
+        done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        result = first_success(done)
+        if result is not None:
+            return result
+    raise RuntimeError(" | ".join(errors))
+
+@st.cache_data(show_spinner=False, ttl=DOCUMENT_CACHE_TTL, max_entries=DOCUMENT_CACHE_MAX_ENTRIES)
+def extract_youtube_documents(video_id, _youtube_url):
+    """Fetch a video transcript, cached on the video id"""
+    return run_async(fetch_first_transcript(
+        video_id, _youtube_url, get_youtube_client(), get_youtube_executor()
+    ))
+
 def load_youtube_documents(youtube_url):
     """Load and process YouTube documents using the correct API"""
     if not YOUTUBE_AVAILABLE:
@@ -786,192 +687,776 @@ def load_youtube_documents(youtube_url):
             st.error("Invalid YouTube URL format")
             return None
         
-        # Create an instance of YouTubeTranscriptApi
-        ytt_api = YouTubeTranscriptApi()
-        
         try:
-            # Use the new fetch() method instead of get_transcript()
-            fetched_transcript = ytt_api.fetch(video_id)
-            
-            # Extract text from the transcript
-            transcript_text = " ".join([snippet.text for snippet in fetched_transcript])
-            
-            documents = [Document(
-                page_content=transcript_text,
-                metadata={
-                    "source": youtube_url,
-                    "video_id": video_id,
-                    "language": fetched_transcript.language,
-                    "language_code": fetched_transcript.language_code,
-                    "is_generated": fetched_transcript.is_generated
-                }
-            )]
-            return documents
+            return extract_youtube_documents(video_id, youtube_url)
             
         except Exception as e:
-            # Try the fallback method using LangChain's YoutubeLoader
-            try:
-                from langchain_community.document_loaders import YoutubeLoader
-                loader = YoutubeLoader.from_youtube_url(youtube_url, add_video_info=True)
-                documents = loader.load()
-                return documents
-                
-            except Exception as fallback_error:
-                st.markdown(f"""
-                <div class="status-error">
-                    <span style="font-size: 1.2rem;">❌</span>
-                    <div>
-                        <strong>Could not fetch YouTube transcript</strong><br>
-                        This could be due to:<br>
-                        • Video has no subtitles/captions<br>
-                        • Subtitles are disabled<br>
-                        • Video is private or restricted<br>
-                        • Geographic restrictions<br><br>
-                        <small>Primary: {str(e)[:100]}... | Fallback: {str(fallback_error)[:100]}...</small>
-                    </div>
+            st.markdown(f"""
+            <div class="status-error">
+                <span style="font-size: 1.2rem;">❌</span>
+                <div>
+                    <strong>Could not fetch YouTube transcript</strong><br>
+                    This could be due to:<br>
+                    • Video has no subtitles/captions<br>
+                    • Subtitles are disabled<br>
+                    • Video is private or restricted<br>
+                    • Geographic restrictions<br><br>
+                    <small>{html.escape(str(e))}</small>
                 </div>
-                """, unsafe_allow_html=True)
-                return None
+            </div>
+            """, unsafe_allow_html=True)
+            return None
                 
     except Exception as e:
         st.error(f"Error loading YouTube video: {str(e)}")
         return None
 
-def summarize_documents(documents, llm):
-    """Summarize documents using stuff chain"""
+async def generate_summary(messages, llm, updates=None):
+    """Run one LLM call, streaming the text so far onto the updates queue when given"""
+    if updates is None:
+        response = await llm.ainvoke(messages)
+        return response.content
+    
+    buffer = []
+    async for chunk in llm.astream(messages):
+        buffer.append(chunk.content)
+        updates.put("".join(buffer))
+    return "".join(buffer)
+
+class SummaryBatcher:
+    """Micro-batches map-step requests from every session for one model.
+    
+    Requests that arrive within BATCH_WINDOW_SECONDS are dispatched to Groq together.
+    One process-wide semaphore caps in-flight calls for the model - batched map calls
+    and direct ones (single-call summaries, streamed reduces) alike - so concurrent
+    users share the rate limit instead of each getting their own budget. Runs on the
+    shared event loop.
+    """
+    
+    def __init__(self, llm):
+        self.llm = llm
+        self.queue = None
+        self.semaphore = None
+        self.tasks = set()  # strong references so running tasks are not garbage collected
+    
+    def _start(self):
+        # Created lazily so the queue and semaphore belong to the shared event loop
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+            self.semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+            self._spawn(self._run())
+    
+    async def submit(self, messages):
+        self._start()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((messages, future))
+        return await future
+    
+    async def generate(self, messages, updates=None):
+        """Run one call outside the micro-batch (optionally streamed), under the same limit"""
+        self._start()
+        async with self.semaphore:
+            return await generate_summary(messages, self.llm, updates)
+    
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+    
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            await asyncio.sleep(BATCH_WINDOW_SECONDS)  # let concurrent submissions join
+            while len(batch) < MAX_BATCH_SIZE and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            # Dispatch without waiting so a slow batch never holds up the next one
+            self._spawn(self._dispatch(batch))
+    
+    async def _dispatch(self, batch):
+        async def call(messages, future):
+            async with self.semaphore:
+                if future.done():
+                    return  # caller was cancelled while queued - skip the request
+                # The call runs in its own task so a caller that gives up (stop, rerun,
+                # a failed sibling) stops the generation and frees the semaphore slot
+                task = asyncio.ensure_future(self.llm.ainvoke(messages))
+                future.add_done_callback(lambda f: f.cancelled() and task.cancel())
+                await asyncio.wait([task])
+            if future.done():
+                return
+            if task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result().content)
+        
+        await asyncio.gather(*[call(messages, future) for messages, future in batch])
+
+@st.cache_resource(show_spinner=False)
+def get_batcher(model_id):
+    """One batcher per model, shared by all sessions"""
+    return SummaryBatcher(get_llm(model_id))
+
+@functools.lru_cache(maxsize=1)
+def get_tokenizer():
+    """Process-wide tiktoken encoding; safe to call from the event loop's worker threads"""
+    return tiktoken.get_encoding(TOKENIZER_ENCODING)
+
+class PromptCompressorLoader:
+    """Loads the LLMLingua-2 compressor the first time a document needs map-reduce,
+    so sessions that only summarize short documents never load the model"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.compressor = None
+    
+    def get(self):
+        """Blocking; call from a worker thread"""
+        with self.lock:
+            if self.compressor is None:
+                import torch
+                from llmlingua import PromptCompressor
+                
+                self.compressor = PromptCompressor(
+                    model_name=PROMPT_COMPRESSION_MODEL,
+                    use_llmlingua2=True,
+                    device_map="cuda" if torch.cuda.is_available() else "cpu"
+                )
+            return self.compressor
+
+@st.cache_resource(show_spinner=False)
+def get_prompt_compressor():
+    """Compressor loader shared by all sessions, or None when llmlingua is not installed"""
+    if not LLMLINGUA_AVAILABLE:
+        return None
+    return PromptCompressorLoader()
+
+def compress_chunks(loader, chunks):
+    """Drop low-information tokens from map-step chunks (blocking; run in a worker thread)"""
+    compressor = loader.get()
+    return [
+        compressor.compress_prompt(
+            chunk, rate=PROMPT_COMPRESSION_RATE, force_tokens=["\n", ".", "!", "?"]
+        )["compressed_prompt"]
+        for chunk in chunks
+    ]
+
+async def gather_or_cancel(coros):
+    """Like asyncio.gather, but cancels the remaining coroutines as soon as one fails"""
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+async def compress_partial_summaries(partial_summaries, batcher, budget=REDUCE_INPUT_TOKEN_BUDGET):
+    """Combine neighbouring partial summaries pairwise until they fit the reduce budget"""
+    encoding = get_tokenizer()
+    
+    async def combine(pair):
+        if len(pair) == 1:
+            return pair[0]
+        return await batcher.submit(build_messages(REDUCE_PROMPT, "\n\n".join(pair)))
+    
+    while (
+        len(partial_summaries) > 2
+        and sum(len(encoding.encode_ordinary(p)) for p in partial_summaries) > budget
+    ):
+        pairs = [partial_summaries[i:i + 2] for i in range(0, len(partial_summaries), 2)]
+        partial_summaries = await gather_or_cancel([combine(pair) for pair in pairs])
+    return partial_summaries
+
+async def summarize_chunks(chunks, batcher, updates=None):
+    """Map every chunk concurrently through the batcher, then reduce in one call"""
+    completed = 0
+    
+    async def map_chunk(chunk):
+        nonlocal completed
+        partial_summary = await batcher.submit(build_messages(MAP_PROMPT, chunk))
+        completed += 1
+        if updates is not None:
+            updates.put(f"⏳ Summarized section {completed}/{len(chunks)}...")
+        return partial_summary
+    
+    if updates is not None:
+        updates.put(f"⏳ Summarizing {len(chunks)} sections...")
+    partial_summaries = await gather_or_cancel([map_chunk(chunk) for chunk in chunks])
+    if updates is not None:
+        updates.put("⏳ Combining section summaries...")
+    partial_summaries = await compress_partial_summaries(partial_summaries, batcher)
+    return await batcher.generate(
+        build_messages(REDUCE_PROMPT, "\n\n".join(partial_summaries)), updates
+    )
+
+def get_chunk_tokens(model_id):
+    """Largest chunk (in tokens) that still leaves room for the prompt and summary"""
+    usable_context = int(MODEL_CONTEXT_TOKENS[model_id] * CONTEXT_SAFETY_FRACTION)
+    return usable_context - OUTPUT_RESERVE_TOKENS - PROMPT_MARGIN_TOKENS
+
+def pack_parts(parts, cap_tokens, overlap_tokens):
+    """Greedily group (separator, text, tokens) parts into chunks of at most cap_tokens,
+    repeating up to overlap_tokens of trailing parts at the start of the next chunk"""
+    chunks = []
+    current, current_tokens, has_new_parts = [], 0, False
+    for part in parts:
+        length = part[2]
+        if has_new_parts and current_tokens + length > cap_tokens:
+            chunks.append(current)
+            carried, carried_tokens = [], 0
+            for previous in reversed(current):
+                if carried_tokens + previous[2] > overlap_tokens:
+                    break
+                carried.insert(0, previous)
+                carried_tokens += previous[2]
+            current, current_tokens, has_new_parts = carried, carried_tokens, False
+        if current_tokens + length > cap_tokens:
+            current, current_tokens = [], 0
+        current.append(part)
+        current_tokens += length
+        has_new_parts = True
+    if has_new_parts:
+        chunks.append(current)
+    return chunks
+
+def split_tokens(encoding, tokens, piece_tokens):
+    """Cut tokens into slices of about piece_tokens that each decode to whole characters.
+    
+    A multi-byte character can span several tokens, and decoding half of it yields
+    U+FFFD. Each cut is moved back until the slice is valid UTF-8, or forward to the
+    next clean cut when no earlier one exists.
+    """
+    def whole_characters(piece):
+        try:
+            encoding.decode_bytes(piece).decode("utf-8")
+        except UnicodeDecodeError:
+            return False
+        return True
+    
+    pieces, start = [], 0
+    while start < len(tokens):
+        end = min(start + piece_tokens, len(tokens))
+        cut = end
+        while cut > start + 1 and not whole_characters(tokens[start:cut]):
+            cut -= 1
+        if not whole_characters(tokens[start:cut]):
+            cut = end
+            while cut < len(tokens) and not whole_characters(tokens[start:cut]):
+                cut += 1
+        pieces.append(tokens[start:cut])
+        start = cut
+    return pieces
+
+def pack_chunks(encoding, text, chunk_tokens, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """Pack lines and sentences into chunks of at most chunk_tokens.
+    
+    Chunks end on sentence boundaries, and the trailing sentences of each chunk
+    (up to overlap_tokens) are repeated at the start of the next one. The map calls
+    run concurrently and the largest chunk sets the latency, so the chunk count of
+    a greedy fill is kept while the per-chunk cap is lowered as far as that count
+    allows. Parts longer than a chunk (e.g. unpunctuated transcripts) are cut on
+    token boundaries first. Text that already fits is returned unchanged.
+    """
+    # Most documents fit in one chunk; skip splitting and re-joining them entirely
+    if len(encoding.encode_ordinary(text)) <= chunk_tokens:
+        return [text]
+    
+    # With the capture group, split() yields text, line break (or None), text, ...
+    pieces = SPLIT_RE.split(text)
+    texts, separators, separator = [], [], ""
+    for i in range(0, len(pieces), 2):
+        if pieces[i]:
+            texts.append(pieces[i])
+            separators.append(separator)
+            separator = " "
+        if i + 1 < len(pieces) and pieces[i + 1]:
+            separator = pieces[i + 1]
+    
+    # One batched call into tiktoken's Rust encoder instead of a call per part
+    piece_tokens = max(1, overlap_tokens) if overlap_tokens < chunk_tokens else chunk_tokens
+    parts = []
+    for separator, part, tokens in zip(separators, texts, encoding.encode_ordinary_batch(texts)):
+        if len(tokens) <= chunk_tokens:
+            parts.append((separator, part, len(tokens)))
+            continue
+        # Slices end on character boundaries, so they concatenate back to the original
+        # text, hence the empty separators
+        for i, piece in enumerate(split_tokens(encoding, tokens, piece_tokens)):
+            parts.append((separator if i == 0 else "", encoding.decode(piece), len(piece)))
+    
+    packed = pack_parts(parts, chunk_tokens, overlap_tokens)
+    if len(packed) > 1:
+        # Binary search the smallest cap that still needs no more chunks than the
+        # greedy fill, so balancing can never add a map call
+        low = max(
+            max(length for _, _, length in parts),
+            math.ceil(sum(length for _, _, length in parts) / len(packed))
+        )
+        high = chunk_tokens
+        while low < high:
+            middle = (low + high) // 2
+            if len(pack_parts(parts, middle, overlap_tokens)) <= len(packed):
+                high = middle
+            else:
+                low = middle + 1
+        packed = pack_parts(parts, high, overlap_tokens)
+    
+    # The first part of a chunk drops the separator that preceded it
+    return [
+        chunk[0][1] + "".join(separator + part for separator, part, _ in chunk[1:])
+        for chunk in packed
+    ]
+
+def preprocess_text(text):
+    """Drop boilerplate lines and repeated sentences from website and transcript text.
+    
+    Only whole boilerplate lines and sentences that are identical after normalizing
+    case, punctuation and whitespace are removed, so no unique sentence is lost.
+    """
+    seen = set()
+    kept_lines = []
+    for line in text.splitlines():
+        line = CAPTION_TAG_RE.sub("", line).strip()
+        if len(line) <= BOILERPLATE_LINE_MAX_CHARS and BOILERPLATE_LINE_RE.match(line):
+            continue
+        
+        sentences = []
+        for sentence in SENTENCE_SPLIT_RE.split(line):
+            key = NON_WORD_RE.sub(" ", sentence).strip().lower()
+            if len(key) >= DEDUPE_MIN_CHARS:
+                if key in seen:
+                    continue
+                seen.add(key)
+            sentences.append(sentence)
+        kept_lines.append(" ".join(sentences))
+    return "\n".join(kept_lines)
+
+async def prepare_chunks(documents, model_id, updates=None):
+    """Clean the documents' text and pack it into chunks sized for the model's context"""
+    if updates is not None:
+        updates.put("⏳ Preparing document...")
+    full_text = "\n\n".join(doc.page_content for doc in documents)
+    # PDF text comes as wrapped visual lines: line-level cleanup would cut sentences
+    # apart and dedupe would drop repeated table rows, so it is left as extracted
+    if not any("page" in doc.metadata for doc in documents):
+        full_text = await asyncio.to_thread(preprocess_text, full_text)
+    # tiktoken releases the GIL, so large inputs do not stall other sessions on the loop
+    return await asyncio.to_thread(pack_chunks, get_tokenizer(), full_text, get_chunk_tokens(model_id))
+
+async def asummarize_documents(documents, batcher, updates=None, compressor=None):
+    """Prepare documents and summarize them, using async map-reduce for large ones.
+    
+    With a compressor loader, map-step chunks are compressed first; the reduce step
+    only ever sees the partial summaries.
+    """
+    chunks = await prepare_chunks(documents, batcher.llm.model_name, updates)
+    
+    # Documents that fit in the context window go out in one call
+    if len(chunks) <= 1:
+        if updates is not None:
+            updates.put("⏳ Generating summary...")
+        return await batcher.generate(build_messages(MAP_PROMPT, "".join(chunks)), updates)
+    
+    # Handle large documents
+    if compressor is not None:
+        chunks = await asyncio.to_thread(compress_chunks, compressor, chunks)
+    return await summarize_chunks(chunks, batcher, updates)
+
+def run_summarization(documents, llm, placeholder=None):
+    """Drive asummarize_documents from the script thread, streaming into the placeholder"""
+    updates = queue.Queue() if placeholder is not None else None
+    # Both are resolved here: cache_resource needs the script thread, not the event loop
+    batcher = get_batcher(llm.model_name)
+    compressor = get_prompt_compressor()
+    return run_async(asummarize_documents(documents, batcher, updates, compressor), placeholder, updates)
+
+async def summarize_batch(docs_list, batcher, k=BATCH_DOCUMENT_CONCURRENCY, compressor=None, updates=None):
+    """Summarize several document sets concurrently, at most k at a time.
+    
+    k only bounds the documents being prepared and summarized at once; every Groq
+    call they make, single-call summaries included, waits on the batcher's
+    process-wide semaphore. Failures are returned in place of their summary, so one
+    bad input does not discard the rest of the batch.
+    """
+    semaphore = asyncio.Semaphore(k)
+    completed = 0
+    
+    async def summarize_one(documents):
+        nonlocal completed
+        async with semaphore:
+            try:
+                return await asummarize_documents(documents, batcher, compressor=compressor)
+            finally:
+                completed += 1
+                if updates is not None:
+                    updates.put(f"⏳ Summarized {completed}/{len(docs_list)} documents...")
+    
+    if updates is not None:
+        updates.put(f"⏳ Summarizing {len(docs_list)} documents...")
+    
+    return await asyncio.gather(
+        *[summarize_one(documents) for documents in docs_list], return_exceptions=True
+    )
+
+def quantized_onnx_file():
+    """Pick the model repo's int8 ONNX export that matches this CPU's instruction set"""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "onnx/model_qint8_arm64.onnx"
     try:
-        chain = load_summarize_chain(
-            llm=llm, 
-            chain_type="stuff",
-            verbose=False
+        with open("/proc/cpuinfo", encoding="utf-8") as cpuinfo:
+            flags = cpuinfo.read()
+    except OSError:
+        flags = ""
+    if "avx512_vnni" in flags:
+        return "onnx/model_qint8_avx512_vnni.onnx"
+    if "avx512f" in flags:
+        return "onnx/model_qint8_avx512.onnx"
+    return "onnx/model_quint8_avx2.onnx"
+
+def load_embedding_model():
+    """Semantic cache encoder: int8 ONNX on CPU when available, FP32 PyTorch otherwise"""
+    from sentence_transformers import SentenceTransformer
+    
+    if ONNX_EMBEDDINGS_AVAILABLE:
+        try:
+            return SentenceTransformer(
+                SEMANTIC_CACHE_MODEL,
+                backend="onnx",
+                model_kwargs={"file_name": quantized_onnx_file(), "provider": "CPUExecutionProvider"}
+            )
+        except Exception:
+            pass  # sentence-transformers < 3.2 or no quantized export; fall back to FP32
+    return SentenceTransformer(SEMANTIC_CACHE_MODEL)
+
+def content_sketch(text):
+    """Bottom-k sketch of the text's word shingles: the smallest 8-byte shingle hashes"""
+    words = NON_WORD_RE.sub(" ", text.lower()).split()
+    hashes = {
+        hashlib.blake2b(" ".join(words[i:i + SEMANTIC_CACHE_SHINGLE_WORDS]).encode(), digest_size=8).digest()
+        for i in range(len(words) - SEMANTIC_CACHE_SHINGLE_WORDS + 1)
+    }
+    return sorted(hashes)[:SEMANTIC_CACHE_SKETCH_SIZE]
+
+def sketch_similarity(sketch, other):
+    """Estimate the shingle Jaccard similarity of two texts from their sketches"""
+    union = sorted(set(sketch) | set(other))[:SEMANTIC_CACHE_SKETCH_SIZE]
+    if not union:
+        return 0.0
+    shared = set(sketch) & set(other)
+    return sum(h in shared for h in union) / len(union)
+
+class SummaryCache:
+    """Persistent summary cache in sqlite: exact lookups by content hash, plus an
+    optional semantic layer (FAISS over input embeddings) for near-duplicate inputs"""
+    
+    def __init__(self, db_path):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS summaries "
+            "(id INTEGER PRIMARY KEY, cache_key TEXT UNIQUE, model_id TEXT, "
+            "embedding BLOB, sketch BLOB, summary TEXT)"
         )
+        # Summaries are stored as zstd BLOBs when available; TEXT rows still read back as-is
+        self.compressor = zstandard.ZstdCompressor(level=SUMMARY_COMPRESSION_LEVEL) if ZSTD_AVAILABLE else None
+        self.decompressor = zstandard.ZstdDecompressor() if ZSTD_AVAILABLE else None
+        self.model = None
+        self.index = None
+        self.row_ids = []  # FAISS position -> sqlite row id
+        if SEMANTIC_CACHE_AVAILABLE:
+            import faiss
+            import numpy as np
+            
+            self.model = load_embedding_model()
+            self.index = faiss.IndexFlatIP(self.model.get_sentence_embedding_dimension())
+            rows = self.db.execute("SELECT id, embedding FROM summaries WHERE embedding IS NOT NULL")
+            for row_id, embedding in rows:
+                self.index.add(np.frombuffer(embedding, dtype="float32").reshape(1, -1))
+                self.row_ids.append(row_id)
+    
+    def get(self, cache_key):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT summary FROM summaries WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            return self._decode(row[0]) if row else None
+    
+    def _encode(self, summary):
+        if self.compressor is None:
+            return summary
+        return self.compressor.compress(summary.encode("utf-8"))
+    
+    def _decode(self, stored):
+        if not isinstance(stored, bytes):
+            return stored
+        if self.decompressor is None:
+            return None  # written by an install with zstandard; treat as a miss
+        return self.decompressor.decompress(stored).decode("utf-8")
+    
+    def embed(self, text):
+        """Embed the opening excerpt; averaging a whole long input drifts toward its domain"""
+        if self.model is None:
+            return None
+        return self.model.encode(
+            [text[:SEMANTIC_CACHE_LEAD_CHARS]], normalize_embeddings=True
+        ).astype("float32")
+    
+    def get_similar(self, embedding, model_id, sketch):
+        if embedding is None or not sketch:
+            return None
+        with self.lock:
+            if not self.row_ids:
+                return None
+            scores, positions = self.index.search(embedding, min(5, len(self.row_ids)))
+            for score, position in zip(scores[0], positions[0]):
+                if score < SEMANTIC_CACHE_THRESHOLD:
+                    break
+                row = self.db.execute(
+                    "SELECT summary, sketch FROM summaries WHERE id = ? AND model_id = ?",
+                    (self.row_ids[position], model_id)
+                ).fetchone()
+                # A shared opening (a template or boilerplate) is not enough on its own
+                if row and sketch_similarity(sketch, self._split_sketch(row[1])) >= SEMANTIC_CACHE_MIN_JACCARD:
+                    return self._decode(row[0])
+        return None
+    
+    @staticmethod
+    def _split_sketch(stored):
+        return [stored[i:i + 8] for i in range(0, len(stored), 8)] if stored else []
+    
+    def put(self, cache_key, model_id, embedding, summary, sketch=None):
+        with self.lock:
+            cursor = self.db.execute(
+                "INSERT OR REPLACE INTO summaries (cache_key, model_id, embedding, sketch, summary) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (cache_key, model_id, None if embedding is None else embedding.tobytes(),
+                 b"".join(sketch) if sketch else None, self._encode(summary))
+            )
+            self.db.commit()
+            if embedding is not None:
+                self.index.add(embedding)
+                self.row_ids.append(cursor.lastrowid)
+    
+    def put_in_background(self, cache_key, model_id, embedding, summary, sketch=None):
+        """Write an entry from a worker thread so the result can be shown without waiting.
         
-        text_splitter = CharacterTextSplitter(
-            chunk_size=4000,
-            chunk_overlap=200,
-            separator="\n"
+        A failed write only costs a future cache hit, so it is logged and never raised.
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            asyncio.to_thread(self.put, cache_key, model_id, embedding, summary, sketch),
+            get_event_loop()
         )
+        future.add_done_callback(log_cache_write_error)
+
+def log_cache_write_error(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("Summary cache write failed: %s", future.exception())
+
+@st.cache_resource(show_spinner=False)
+def get_summary_cache():
+    """Process-wide summary cache shared by all sessions"""
+    return SummaryCache(SUMMARY_CACHE_PATH)
+
+def get_cache_key(content, model_id):
+    """Exact cache key and semantic-match variant for a document's content"""
+    compression = PROMPT_COMPRESSION_RATE if LLMLINGUA_AVAILABLE else None
+    chunk_params = (get_chunk_tokens(model_id), CHUNK_OVERLAP_TOKENS, compression)
+    cache_key = hashlib.sha256(
+        f"{content}|{model_id}|{chunk_params}|{PROMPT_VERSION}".encode()
+    ).hexdigest()
+    # Semantic hits must come from the same model and prompts as well
+    return cache_key, f"{model_id}@{PROMPT_VERSION}"
+
+def summarize_documents(documents, llm, placeholder=None):
+    """Summarize documents, reusing cached summaries for previously seen content"""
+    try:
+        content = "".join(doc.page_content for doc in documents)
+        cache_key, cache_variant = get_cache_key(content, llm.model_name)
+        
+        cache = get_summary_cache()
+        summary = cache.get(cache_key)
+        if summary is not None:
+            return summary
         
-        # Handle large documents
-        if len(documents) == 1 and len(documents[0].page_content) > 4000:
-            split_docs = text_splitter.split_documents(documents)
-            if len(split_docs) > 1:
-                summaries = []
-                for doc in split_docs:
-                    summary = chain.invoke({"input_documents": [doc]})
-                    summaries.append(Document(page_content=summary["output_text"]))
-                final_summary = chain.invoke({"input_documents": summaries})
-                return final_summary["output_text"]
+        embedding = cache.embed(content)
+        sketch = content_sketch(content) if embedding is not None else None
+        summary = cache.get_similar(embedding, cache_variant, sketch)
+        if summary is not None:
+            # Near-duplicate hit: remember the exact key without re-indexing the embedding
+            cache.put_in_background(cache_key, cache_variant, None, summary)
+            st.info("♻️ Showing the cached summary of a near-identical document. Small differences may not be reflected.")
+            return summary
         
-        summary = chain.invoke({"input_documents": documents})
-        return summary["output_text"]
+        summary = run_summarization(documents, llm, placeholder)
+        # An empty reply is not cached, so the next Generate retries instead of replaying it
+        if summary:
+            cache.put_in_background(cache_key, cache_variant, embedding, summary, sketch)
+        return summary
         
     except Exception as e:
         st.error(f"Error during summarization: {str(e)}")
         return None
 
+def summarize_documents_batch(docs_list, llm):
+    """Summarize several document sets, sending only the exact-cache misses to Groq"""
+    cache = get_summary_cache()
+    keys = [
+        get_cache_key("".join(doc.page_content for doc in documents), llm.model_name)
+        for documents in docs_list
+    ]
+    summaries = [cache.get(cache_key) for cache_key, _ in keys]
+    misses = [i for i, summary in enumerate(summaries) if summary is None]
+    if not misses:
+        return summaries
+    
+    batcher = get_batcher(llm.model_name)
+    compressor = get_prompt_compressor()
+    progress, updates = st.empty(), queue.Queue()
+    results = run_async(
+        summarize_batch(
+            [docs_list[i] for i in misses], batcher, compressor=compressor, updates=updates
+        ),
+        progress, updates
+    )
+    progress.empty()
+    for i, result in zip(misses, results):
+        if isinstance(result, Exception):
+            st.error(f"Error during summarization: {str(result)}")
+            continue
+        cache_key, cache_variant = keys[i]
+        # Batch results are cached by exact key only, skipping the embedding pass
+        if result:
+            cache.put_in_background(cache_key, cache_variant, None, result)
+        summaries[i] = result
+    return summaries
+
 # Reset content loaded when method changes
 def reset_content_state():
-    st.session_state.content_loaded = False
-    st.session_state.documents = None
-    st.session_state.summary_result = ""
+    state.content_loaded = False
+    state.documents = None
+    state.summary_result = ""
+    state.batch_results = None
 
-# Enhanced Header
-st.markdown("""
+# Enhanced Header and Step 1 heading, sent with the stylesheet as one element
+st.markdown(load_css() + """
 <div class="main-header animated">
     <h1>🔍 AI Document Summarizer</h1>
     <p>Transform your documents, articles, and videos into concise, intelligent summaries powered by advanced AI technology</p>
 </div>
-""", unsafe_allow_html=True)
 
-# Step 1: Enhanced card-based method selection with working functionality
-st.markdown("""
 <div class="step-container animated">
     <div class="step-header">🎯 Step 1: Choose Your Input Method</div>
 </div>
 """, unsafe_allow_html=True)
 
-# Create three columns for method cards
-col1, col2, col3 = st.columns(3)
-
-with col1:
-    if st.button("📄 PDF Document", key="pdf_card", use_container_width=True):
-        st.session_state.selected_method = "📄 PDF Document"
-        reset_content_state()
-    
-    # Card styling
-    selected_class = "selected" if st.session_state.selected_method == "📄 PDF Document" else ""
-    st.markdown(f"""
-    <div class="method-card {selected_class}">
-        <div class="method-icon">📄</div>
-        <div class="method-title">PDF Document</div>
-        <div class="method-description">Upload and analyze PDF files with intelligent text extraction and processing</div>
-        <div class="method-features">
-            <div class="feature-item">✓ Multi-page support</div>
-            <div class="feature-item">✓ Text & image extraction</div>
-            <div class="feature-item">✓ Structured content analysis</div>
-        </div>
+# Card markup shared by all three input methods; only the selected class varies per rerun
+METHOD_CARD_TEMPLATE = Template("""
+<div class="method-card $selected_class">
+    <div class="method-icon">$icon</div>
+    <div class="method-title">$title</div>
+    <div class="method-description">$description</div>
+    <div class="method-features">
+        $features
     </div>
-    """, unsafe_allow_html=True)
+</div>
+""")
 
-with col2:
-    if st.button("🌐 Website Article", key="website_card", use_container_width=True):
-        st.session_state.selected_method = "🌐 Website Article"
-        reset_content_state()
-    
-    selected_class = "selected" if st.session_state.selected_method == "🌐 Website Article" else ""
-    st.markdown(f"""
-    <div class="method-card {selected_class}">
-        <div class="method-icon">🌐</div>
-        <div class="method-title">Website Article</div>
-        <div class="method-description">Extract and summarize content from any web article, blog post, or online resource</div>
-        <div class="method-features">
-            <div class="feature-item">✓ Real-time web scraping</div>
-            <div class="feature-item">✓ Clean content extraction</div>
-            <div class="feature-item">✓ Multiple formats supported</div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+# (button label / method, button key, card fields)
+METHOD_CARDS = [
+    ("📄 PDF Document", "pdf_card", {
+        "icon": "📄",
+        "title": "PDF Document",
+        "description": "Upload and analyze PDF files with intelligent text extraction and processing",
+        "features": ["Multi-page support", "Text & image extraction", "Structured content analysis"]
+    }),
+    ("🌐 Website Article", "website_card", {
+        "icon": "🌐",
+        "title": "Website Article",
+        "description": "Extract and summarize content from any web article, blog post, or online resource",
+        "features": ["Real-time web scraping", "Clean content extraction", "Multiple formats supported"]
+    }),
+    ("📺 YouTube Video", "youtube_card", {
+        "icon": "📺",
+        "title": "YouTube Video",
+        "description": "Generate intelligent summaries from video transcripts and automated captions",
+        "features": ["Automatic transcript fetch", "Multiple language support", "Video metadata included"]
+    })
+]
 
-with col3:
-    if st.button("📺 YouTube Video", key="youtube_card", use_container_width=True):
-        st.session_state.selected_method = "📺 YouTube Video"
-        reset_content_state()
-    
-    selected_class = "selected" if st.session_state.selected_method == "📺 YouTube Video" else ""
-    st.markdown(f"""
-    <div class="method-card {selected_class}">
-        <div class="method-icon">📺</div>
-        <div class="method-title">YouTube Video</div>
-        <div class="method-description">Generate intelligent summaries from video transcripts and automated captions</div>
-        <div class="method-features">
-            <div class="feature-item">✓ Automatic transcript fetch</div>
-            <div class="feature-item">✓ Multiple language support</div>
-            <div class="feature-item">✓ Video metadata included</div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+# Create three columns for method cards
+for column, (method, button_key, card) in zip(st.columns(3), METHOD_CARDS):
+    with column:
+        if st.button(method, key=button_key, use_container_width=True):
+            state.selected_method = method
+            reset_content_state()
+        
+        # Card styling
+        st.markdown(METHOD_CARD_TEMPLATE.substitute(
+            card,
+            selected_class="selected" if state.selected_method == method else "",
+            features="".join(f'<div class="feature-item">✓ {feature}</div>' for feature in card["features"])
+        ), unsafe_allow_html=True)
 
 # Step 2: Enhanced input section based on selection
-st.markdown("""
+INPUT_TITLES = {
+    "📄 PDF Document": "📤 Upload PDF File",
+    "🌐 Website Article": "🔗 Enter Website URL",
+    "📺 YouTube Video": "🎥 Enter YouTube URL"
+}
+input_title = INPUT_TITLES.get(state.selected_method)
+st.markdown(f"""
 <div class="step-container animated">
     <div class="step-header">📝 Step 2: Provide Your Input</div>
 </div>
+{f'<div class="input-section"><div class="input-title">{input_title}</div></div>' if input_title else ''}
 """, unsafe_allow_html=True)
 
-if st.session_state.selected_method == "📄 PDF Document":
-    st.markdown("""
-    <div class="input-section">
-        <div class="input-title">📤 Upload PDF File</div>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    uploaded_pdf = st.file_uploader(
-        "Choose a PDF file to summarize",
-        type="pdf",
-        help="Upload a PDF document (max 200MB) - supports multi-page documents with text and images"
+if state.selected_method == "📄 PDF Document":
+    batch_mode = st.checkbox(
+        "📚 Batch mode",
+        key="batch_mode",
+        help="Upload several PDFs and summarize them all at once"
     )
     
+    uploaded_pdf = None
+    if batch_mode:
+        uploaded_pdfs = st.file_uploader(
+            "Choose PDF files to summarize",
+            type="pdf",
+            accept_multiple_files=True,
+            help="Upload several PDF documents (max 200MB each) - each one gets its own summary"
+        )
+        
+        if uploaded_pdfs and st.button(f"📚 Summarize {len(uploaded_pdfs)} PDFs", type="primary", key="summarize_batch"):
+            current_model = GROQ_MODELS[state.selected_model]
+            with st.spinner(f"🤖 {current_model['description']} is analyzing {len(uploaded_pdfs)} documents..."):
+                loaded = [(pdf.name, load_pdf_documents(pdf)) for pdf in uploaded_pdfs]
+                loaded = [(name, documents) for name, documents in loaded if documents]
+                summaries = summarize_documents_batch(
+                    [documents for _, documents in loaded], get_llm(current_model["id"])
+                ) if loaded else []
+                state.batch_results = [(name, summary) for (name, _), summary in zip(loaded, summaries)]
+        
+        for i, (file_name, summary) in enumerate(state.batch_results or []):
+            with st.expander(f"📄 {file_name}", expanded=len(state.batch_results) == 1):
+                if summary:
+                    st.markdown(summary)
+                    st.download_button(
+                        label="💾 Download Summary",
+                        data=summary,
+                        file_name=f"{os.path.splitext(file_name)[0]}_summary.txt",
+                        mime="text/plain",
+                        key=f"download_batch_{i}"
+                    )
+                else:
+                    st.markdown('<div class="status-error"><span style="font-size: 1.2rem;">❌</span><div><strong>Failed to summarize this PDF</strong><br><small>Check error details above for more information</small></div></div>', unsafe_allow_html=True)
+    else:
+        uploaded_pdf = st.file_uploader(
+            "Choose a PDF file to summarize",
+            type="pdf",
+            help="Upload a PDF document (max 200MB) - supports multi-page documents with text and images"
+        )
+    
     if uploaded_pdf:
         st.markdown(f'''
         <div class="status-success">
@@ -988,9 +1473,9 @@ if st.session_state.selected_method == "📄 PDF Document":
             with st.spinner("📖 Processing PDF document..."):
                 documents = load_pdf_documents(uploaded_pdf)
                 if documents:
-                    st.session_state.documents = documents
-                    st.session_state.content_loaded = True
-                    st.session_state.input_type = "PDF"
+                    state.documents = documents
+                    state.content_loaded = True
+                    state.input_type = "PDF"
                     st.markdown(f'''
                     <div class="status-success">
                         <span style="font-size: 1.2rem;">✅</span>
@@ -1003,13 +1488,7 @@ if st.session_state.selected_method == "📄 PDF Document":
                 else:
                     st.markdown('<div class="status-error"><span style="font-size: 1.2rem;">❌</span><div><strong>Failed to process PDF</strong><br><small>Please check the file format and try again</small></div></div>', unsafe_allow_html=True)
 
-elif st.session_state.selected_method == "🌐 Website Article":
-    st.markdown("""
-    <div class="input-section">
-        <div class="input-title">🔗 Enter Website URL</div>
-    </div>
-    """, unsafe_allow_html=True)
-    
+elif state.selected_method == "🌐 Website Article":
     website_url = st.text_input(
         "Website URL",
         placeholder="https://example.com/article",
@@ -1033,9 +1512,9 @@ elif st.session_state.selected_method == "🌐 Website Article":
                 with st.spinner("🌐 Fetching and extracting website content..."):
                     documents = load_url_documents(website_url)
                     if documents:
-                        st.session_state.documents = documents
-                        st.session_state.content_loaded = True
-                        st.session_state.input_type = "Website"
+                        state.documents = documents
+                        state.content_loaded = True
+                        state.input_type = "Website"
                         content_length = len(documents[0].page_content) if documents else 0
                         st.markdown(f'''
                         <div class="status-success">
@@ -1051,13 +1530,7 @@ elif st.session_state.selected_method == "🌐 Website Article":
         else:
             st.markdown('<div class="status-error"><span style="font-size: 1.2rem;">❌</span><div><strong>Invalid URL format</strong><br><small>Please enter a complete URL starting with http:// or https://</small></div></div>', unsafe_allow_html=True)
 
-elif st.session_state.selected_method == "📺 YouTube Video":
-    st.markdown("""
-    <div class="input-section">
-        <div class="input-title">🎥 Enter YouTube URL</div>
-    </div>
-    """, unsafe_allow_html=True)
-    
+elif state.selected_method == "📺 YouTube Video":
     if not YOUTUBE_AVAILABLE:
         st.markdown('<div class="status-warning"><span style="font-size: 1.2rem;">⚠️</span><div><strong>YouTube functionality requires additional package</strong><br><small>Run: <code>pip install youtube-transcript-api</code></small></div></div>', unsafe_allow_html=True)
     else:
@@ -1087,9 +1560,9 @@ elif st.session_state.selected_method == "📺 YouTube Video":
                     with st.spinner("📺 Fetching YouTube transcript..."):
                         documents = load_youtube_documents(youtube_url)
                         if documents:
-                            st.session_state.documents = documents
-                            st.session_state.content_loaded = True
-                            st.session_state.input_type = "YouTube"
+                            state.documents = documents
+                            state.content_loaded = True
+                            state.input_type = "YouTube"
                             transcript_length = len(documents[0].page_content) if documents else 0
                             language = documents[0].metadata.get('language', 'Unknown') if documents else 'Unknown'
                             st.markdown(f'''
@@ -1114,15 +1587,15 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Show content loaded status
-if st.session_state.content_loaded and st.session_state.documents:
-    content_preview = st.session_state.documents[0].page_content[:200] + "..." if st.session_state.documents else ""
-    current_model = GROQ_MODELS[st.session_state.selected_model]
+if state.content_loaded and state.documents:
+    content_preview = state.documents[0].page_content[:200] + "..." if state.documents else ""
+    current_model = GROQ_MODELS[state.selected_model]
     st.markdown(f'''
     <div class="status-info">
         <span style="font-size: 1.2rem;">✅</span>
         <div>
-            <strong>{st.session_state.input_type} content loaded and ready!</strong><br>
-            <small>Will use: {st.session_state.selected_model} • Preview: {content_preview}</small>
+            <strong>{state.input_type} content loaded and ready!</strong><br>
+            <small>Will use: {state.selected_model} • Preview: {content_preview}</small>
         </div>
     </div>
     ''', unsafe_allow_html=True)
@@ -1131,25 +1604,29 @@ if st.session_state.content_loaded and st.session_state.documents:
     if st.button("✨ Generate AI Summary", type="primary"):
         with st.spinner(f"🤖 {current_model['description']} is analyzing your content..."):
             try:
-                llm = get_llm()
-                summary = summarize_documents(st.session_state.documents, llm)
+                llm = get_llm(current_model["id"])
+                summary_placeholder = st.empty()
+                summary = summarize_documents(state.documents, llm, summary_placeholder)
                 
                 if summary:
-                    st.session_state.summary_result = summary
+                    state.summary_result = summary
+                    # The results view below renders in this same run; no extra rerun needed
+                    summary_placeholder.empty()
                     st.markdown('<div class="status-success"><span style="font-size: 1.2rem;">✅</span><div><strong>AI summary generated successfully!</strong><br><small>Summary is ready for review and download</small></div></div>', unsafe_allow_html=True)
-                    st.experimental_rerun()  # Refresh to show results
                 else:
                     st.markdown('<div class="status-error"><span style="font-size: 1.2rem;">❌</span><div><strong>Failed to generate summary</strong><br><small>Please try again or contact support</small></div></div>', unsafe_allow_html=True)
             except Exception as e:
                 st.markdown(f'<div class="status-error"><span style="font-size: 1.2rem;">❌</span><div><strong>AI processing error</strong><br><small>{str(e)[:100]}...</small></div></div>', unsafe_allow_html=True)
 
-elif st.session_state.content_loaded and not st.session_state.documents:
+elif state.content_loaded and not state.documents:
     st.markdown('<div class="status-error"><span style="font-size: 1.2rem;">❌</span><div><strong>Content loading issue detected</strong><br><small>Please try reloading your content using the Load button above</small></div></div>', unsafe_allow_html=True)
 else:
     st.markdown('<div class="status-info"><span style="font-size: 1.2rem;">👆</span><div><strong>Ready to process your content</strong><br><small>Please load your content first using the Load button above</small></div></div>', unsafe_allow_html=True)
 
 # Enhanced Results Display
-if st.session_state.summary_result:
+# A fragment, so copy/download clicks rerun only the results instead of the whole page
+@st.fragment
+def results_view():
     st.markdown("""
     <div class="summary-container animated">
         <h2 style="color: #2c3e50; margin-bottom: 1.5rem; font-family: 'Poppins', sans-serif; font-weight: 600;">📝 AI-Generated Summary</h2>
@@ -1162,15 +1639,15 @@ if st.session_state.summary_result:
     with tab1:
         st.markdown(f"""
         <div class="summary-text">
-            {st.session_state.summary_result}
+            {state.summary_result}
         </div>
         """, unsafe_allow_html=True)
     
     with tab2:
         col1, col2, col3 = st.columns(3)
         
-        word_count = len(st.session_state.summary_result.split())
-        char_count = len(st.session_state.summary_result)
+        word_count = sum(1 for _ in WORD_RE.finditer(state.summary_result))
+        char_count = len(state.summary_result)
         reading_time = max(1, word_count // 200)
         
         with col1:
@@ -1198,8 +1675,8 @@ if st.session_state.summary_result:
             """, unsafe_allow_html=True)
         
         # Additional analytics
-        sentences = st.session_state.summary_result.count('.') + st.session_state.summary_result.count('!') + st.session_state.summary_result.count('?')
-        paragraphs = len([p for p in st.session_state.summary_result.split('\n') if p.strip()])
+        sentences = state.summary_result.count('.') + state.summary_result.count('!') + state.summary_result.count('?')
+        paragraphs = len([p for p in state.summary_result.split('\n') if p.strip()])
         
         st.markdown("### 📈 Content Analysis")
         col4, col5, col6 = st.columns(3)
@@ -1208,7 +1685,7 @@ if st.session_state.summary_result:
         with col5:
             st.metric("Paragraphs", f"{paragraphs}")
         with col6:
-            current_model = GROQ_MODELS[st.session_state.selected_model]
+            current_model = GROQ_MODELS[state.selected_model]
             st.metric("Model Used", current_model['id'].split('/')[-1])
     
     with tab3:
@@ -1216,19 +1693,19 @@ if st.session_state.summary_result:
         
         with col1:
             if st.button("📋 Copy to Clipboard", key="copy_btn"):
-                st.code(st.session_state.summary_result, language=None)
+                st.code(state.summary_result, language=None)
                 st.success("📋 Summary ready to copy - select the text above!")
         
         with col2:
             # Enhanced download with timestamp and model info
             from datetime import datetime
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            model_name = GROQ_MODELS[st.session_state.selected_model]['id'].replace('/', '_')
-            filename = f"{st.session_state.input_type.lower()}_{model_name}_{timestamp}.txt"
+            model_name = GROQ_MODELS[state.selected_model]['id'].replace('/', '_')
+            filename = f"{state.input_type.lower()}_{model_name}_{timestamp}.txt"
             
             st.download_button(
                 label="💾 Download Summary",
-                data=st.session_state.summary_result,
+                data=state.summary_result,
                 file_name=filename,
                 mime="text/plain",
                 help="Download the summary as a text file with model info"
@@ -1237,10 +1714,16 @@ if st.session_state.summary_result:
         with col3:
             if st.button("🔄 Create New Summary", key="new_summary_btn"):
                 # Reset all states
-                for key in ['summary_result', 'content_loaded', 'documents', 'input_type']:
-                    if key in st.session_state:
-                        del st.session_state[key]
-                st.experimental_rerun()
+                reset_content_state()
+                state.input_type = None
+                st.rerun()
+
+if state.summary_result:
+    results_view()
+
+# Runs before the rerun a model button triggers, so the whole page already sees the new model
+def select_model(model_name):
+    state.selected_model = model_name
 
 # Enhanced Sidebar (Now Much Wider with Model Selection!)
 with st.sidebar:
@@ -1260,17 +1743,17 @@ with st.sidebar:
     st.markdown("#### 🚀 **Production Models** (Recommended)")
     for model_name in production_models:
         model_info = GROQ_MODELS[model_name]
-        if st.button(
+        st.button(
             f"{model_name}",
             key=f"model_{model_name}",
             help=f"{model_info['description']} • Context: {model_info['context']} • {model_info['speed']} • {model_info['cost']}",
-            use_container_width=True
-        ):
-            st.session_state.selected_model = model_name
-            st.experimental_rerun()
+            use_container_width=True,
+            on_click=select_model,
+            args=(model_name,)
+        )
         
         # Show selection indicator
-        if st.session_state.selected_model == model_name:
+        if state.selected_model == model_name:
             st.markdown(f'''
             <div style="background: linear-gradient(135deg, #10b981, #059669); color: white; padding: 0.5rem; border-radius: 8px; margin: 0.5rem 0; font-size: 0.85rem;">
                 ✅ <strong>Selected:</strong> {model_info['description']}<br>
@@ -1282,17 +1765,17 @@ with st.sidebar:
     with st.expander("Show Preview Models", expanded=False):
         for model_name in preview_models:
             model_info = GROQ_MODELS[model_name]
-            if st.button(
+            st.button(
                 f"{model_name}",
                 key=f"model_preview_{model_name}",
                 help=f"{model_info['description']} • Context: {model_info['context']} • {model_info['speed']} • {model_info['cost']}",
-                use_container_width=True
-            ):
-                st.session_state.selected_model = model_name
-                st.experimental_rerun()
+                use_container_width=True,
+                on_click=select_model,
+                args=(model_name,)
+            )
             
             # Show selection indicator for preview models
-            if st.session_state.selected_model == model_name:
+            if state.selected_model == model_name:
                 st.markdown(f'''
                 <div style="background: linear-gradient(135deg, #f59e0b, #d97706); color: white; padding: 0.5rem; border-radius: 8px; margin: 0.5rem 0; font-size: 0.85rem;">
                     ⚠️ <strong>Preview Selected:</strong> {model_info['description']}<br>
@@ -1308,10 +1791,10 @@ with st.sidebar:
     """, unsafe_allow_html=True)
     
     # Show current status with enhanced styling
-    if st.session_state.content_loaded:
+    if state.content_loaded:
         st.markdown(f"""
         <div class="sidebar-status" style="background: linear-gradient(135deg, #10b981, #059669); color: white;">
-            ✅ {st.session_state.input_type} Content Loaded
+            ✅ {state.input_type} Content Loaded
         </div>
         """, unsafe_allow_html=True)
     else:
@@ -1324,7 +1807,7 @@ with st.sidebar:
     # Show selected method
     st.markdown(f"""
     <div class="sidebar-status" style="background: linear-gradient(135deg, #667eea, #764ba2); color: white;">
-        🎯 Input: {st.session_state.selected_method.replace("📄 ", "").replace("🌐 ", "").replace("📺 ", "")}
+        🎯 Input: {state.selected_method.replace("📄 ", "").replace("🌐 ", "").replace("📺 ", "")}
     </div>
     """, unsafe_allow_html=True)
     
@@ -1356,16 +1839,18 @@ with st.sidebar:
     
     ### 🤖 **Current AI Configuration**
     
-    **Selected Model:** `{GROQ_MODELS[st.session_state.selected_model]['id']}`  
-    **Description:** {GROQ_MODELS[st.session_state.selected_model]['description']}  
-    **Context Window:** {GROQ_MODELS[st.session_state.selected_model]['context']} tokens  
-    **Performance:** {GROQ_MODELS[st.session_state.selected_model]['speed']}  
-    **Cost Level:** {GROQ_MODELS[st.session_state.selected_model]['cost']}
+    **Selected Model:** `{GROQ_MODELS[state.selected_model]['id']}`  
+    **Description:** {GROQ_MODELS[state.selected_model]['description']}  
+    **Context Window:** {GROQ_MODELS[state.selected_model]['context']} tokens  
+    **Performance:** {GROQ_MODELS[state.selected_model]['speed']}  
+    **Cost Level:** {GROQ_MODELS[state.selected_model]['cost']}
     
     **Processing Features:**
     - Temperature: 0 (Deterministic output)
-    - Intelligent text chunking for large docs
-    - Hierarchical summarization
+    - Token-aware chunking sized to the model context
+    - Concurrent map-reduce summarization
+    - Streaming output
+    - Summary caching (exact + semantic)
     - Error recovery & fallbacks
     - Content validation
     
@@ -1391,7 +1876,7 @@ with st.sidebar:
         st.code("""
 # Core Requirements (Essential)
 pip install streamlit langchain langchain-community
-pip install langchain-groq validators pypdf
+pip install langchain-groq validators pypdfium2
 pip install unstructured python-dotenv
 
 # YouTube Support (Recommended)
@@ -1400,6 +1885,13 @@ pip install youtube-transcript-api
 # Optional Enhancements  
 pip install beautifulsoup4 requests
 
+# Semantic Summary Cache (Optional)
+pip install faiss-cpu sentence-transformers
+pip install "optimum[onnxruntime]"  # int8 embeddings on CPU
+
+# Prompt Compression for Long Documents (Optional)
+pip install llmlingua
+
 # Environment Setup
 # Create .env file with:
 # GROQ_API_KEY=your_groq_api_key_here
@@ -1481,8 +1973,8 @@ st.markdown(f"""
         Powered by <strong>Groq's Lightning-Fast LLM Inference</strong>
     </div>
     <div style="font-family: 'Inter', sans-serif; opacity: 0.8; font-size: 0.9rem;">
-        Current Model: <strong>{GROQ_MODELS[st.session_state.selected_model]['id']}</strong><br>
-        {GROQ_MODELS[st.session_state.selected_model]['description']}
+        Current Model: <strong>{GROQ_MODELS[state.selected_model]['id']}</strong><br>
+        {GROQ_MODELS[state.selected_model]['description']}
     </div>
     <div style="font-family: 'Inter', sans-serif; opacity: 0.7; font-size: 0.9rem; margin-top: 0.5rem;">
         © 2025 AI Document Summarizer • Professional AI-Powered Content Analysis<br>